@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
-import re
-from datetime import datetime
+import hashlib
+import io
+import tempfile
+import time
+from pathlib import Path
 import plotly.express as px
 
+from log_core import BOTS_AI, BOTS_TRADITIONAL, parse_raw_log
+
 # -----------------------------------------------------------------------------
 # 1. VISUAL CONFIGURATION (Dejan Style - Light Mode Forced)
 # -----------------------------------------------------------------------------
@@ -44,59 +49,119 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # -----------------------------------------------------------------------------
-# 2. BOT DATABASE
+# 2. LOG PARSER
 # -----------------------------------------------------------------------------
-# Comprehensive list of AI Agents (Scrapers/LLMs)
-BOTS_AI = [
-    r'gptbot', r'chatgpt-user', r'oai-searchbot', r'openai',  # OpenAI
-    r'claudebot', r'claude-web', r'anthropic',               # Anthropic
-    r'perplexitybot', r'perplexity',                         # Perplexity
-    r'applebot-extended',                                    # Apple AI
-    r'google-extended', r'googleother', r'vertexai',         # Google AI
-    r'ccbot', r'commoncrawl',                                # Common Crawl
-    r'cohere-ai', r'cohere',                                 # Cohere
-    r'diffbot', r'bytespider', r'imagesiftbot',              # ByteDance/Scrapers
-    r'facebookbot', r'meta-externalagent', r'omgilibot',     # Meta
-    r'amazonbot', r'amazon-q',                               # Amazon
-    r'youbot', r'msnbot-media', r'bingbot-media',            # Other AI Search
-    r'ai2bot', r'mistral', r'dataminr', r'seekr',
-    r'meltwater', r'turnitin', r'sidetrade', r'semrushbot-si', 
-    r'chatgpt' # Fallback
-]
+# Parsed frames persist as Parquet keyed by file hash; bump PARSER_VERSION when the schema changes
+PARSER_VERSION = 5
+PARQUET_CACHE_DIR = Path(tempfile.gettempdir()) / "loganalyzer_cache"
+# The cache holds user data (IPs, paths, UAs): capped in size and age, least recently used evicted first
+PARQUET_CACHE_MAX_BYTES = 512 << 20
+PARQUET_CACHE_MAX_AGE = 7 * 24 * 3600
+# A temp file this old was left by a crashed write, not one still in progress
+PARQUET_TMP_MAX_AGE = 3600
+
+def parquet_cache_dir():
+    # Private to this user; chmod fails on a directory someone else created, which just disables the cache
+    try:
+        PARQUET_CACHE_DIR.mkdir(mode=0o700, exist_ok=True)
+        PARQUET_CACHE_DIR.chmod(0o700)
+        return PARQUET_CACHE_DIR
+    except OSError: return None
+
+def prune_parquet_cache(cache_dir: Path, version: int) -> None:
+    # Files from other parser versions can never be read again; the rest are dropped oldest first
+    now, kept = time.time(), []
+    for path in cache_dir.glob("*.parquet"):
+        try:
+            stat = path.stat()
+            if not path.name.endswith(f"-v{version}.parquet") or now - stat.st_mtime > PARQUET_CACHE_MAX_AGE:
+                path.unlink()
+            else:
+                kept.append((stat.st_mtime, stat.st_size, path))
+        except OSError: pass
+    for path in cache_dir.glob("*.tmp"):
+        try:
+            if now - path.stat().st_mtime > PARQUET_TMP_MAX_AGE: path.unlink()
+        except OSError: pass
+    total = sum(size for _, size, _ in kept)
+    for _, size, path in sorted(kept):
+        if total <= PARQUET_CACHE_MAX_BYTES: break
+        try:
+            path.unlink()
+            total -= size
+        except OSError: pass
 
-# Comprehensive list of Standard SEO Crawlers
-BOTS_TRADITIONAL = [
-    r'googlebot', r'bingbot', r'yandex', r'baiduspider', r'duckduckbot', r'sogou', r'exabot', r'slurp', # Engines
-    r'ahrefsbot', r'semrushbot', r'dotbot', r'mj12bot', r'rogerbot', r'moz', r'serpstat',                # SEO Tools
-    r'petalbot', r'aspiegel', r'aspiegelbot',                                                            # Huawei
-    r'pinterest', r'linkedinbot', r'slackbot', r'twitterbot', r'facebookexternalhit', r'discordbot',     # Social
-    r'telegrambot', r'whatsapp', r'skypeuripreview',
-    r'uptime', r'pingdom', r'gtmetrix', r'screaming frog',
-    r'adsbot-google', r'mediapartners-google', r'feedfetcher-google' # Google specific services
-]
+def upload_digest(raw_bytes: bytes) -> str:
+    # Identifies an upload for the disk cache and every st.cache_data below
+    return hashlib.blake2b(raw_bytes, digest_size=12).hexdigest()
 
-def identify_bot(ua: str):
-    if not ua or ua == "-": return "Human / Other"
-    ua_l = ua.lower()
+# Cached on the upload digest and the parser version: widget interactions rerun the script but
+# reuse the parsed frame, and a version bump invalidates the in-memory cache as well as the disk one.
+# The bytes themselves are underscored so Streamlit doesn't hash them a second time.
+@st.cache_data(show_spinner=False, max_entries=4)
+def parse_log(_raw_bytes: bytes, upload_key: str, parser_version: int) -> pd.DataFrame:
+    cache_dir = parquet_cache_dir()
+    if cache_dir is not None:
+        cache_path = cache_dir / f"{upload_key}-v{parser_version}.parquet"
+        if cache_path.exists():
+            try:
+                df = pd.read_parquet(cache_path)
+                cache_path.touch()  # mtime marks recent use for eviction
+                return df
+            except Exception: pass
     
-    # Check AI First (They are the priority for blocking/analysis)
-    for p in BOTS_AI:
-        if p in ua_l: return "LLM / AI Agent"
-        
-    # Check Standard
-    for p in BOTS_TRADITIONAL:
-        if p in ua_l: return "Standard Bot"
-        
-    return "Human / Other"
+    df = parse_raw_log(_raw_bytes)
+    if not df.empty and cache_dir is not None:
+        # Best effort: a read-only or full temp dir just means no disk cache. Each write gets its
+        # own temp file, so sessions parsing the same upload never interleave into one
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as tmp:
+                tmp_path = Path(tmp.name)
+                df.to_parquet(tmp, compression="zstd")
+            tmp_path.replace(cache_path)
+            prune_parquet_cache(cache_dir, parser_version)
+        except Exception:
+            if tmp_path is not None:
+                try: tmp_path.unlink(missing_ok=True)
+                except OSError: pass
+    return df
+
+# Table views show the newest rows only; the exports still carry every event
+DISPLAY_ROWS = 5000
+
+def latest_rows(frame: pd.DataFrame, show_all: bool = False) -> pd.DataFrame:
+    if show_all or len(frame) <= DISPLAY_ROWS:
+        return frame.sort_values(by="Time", ascending=False)
+    # Partial top-k sort (O(N log k)); nlargest skips NaT, so unparsed times pad the tail like sort_values
+    view = frame.nlargest(DISPLAY_ROWS, "Time")
+    if len(view) < DISPLAY_ROWS:
+        view = pd.concat([view, frame[frame["Time"].isna()].head(DISPLAY_ROWS - len(view))])
+    return view
 
-def extract_time(ts_string: str):
-    # Standard NCSA format: 19/Sep/2025:00:00:39 +0530
-    if not ts_string: return None
-    ts = ts_string.strip()
-    for fmt in ("%d/%b/%Y:%H:%M:%S %z", "%d/%b/%Y:%H:%M:%S"):
-        try: return datetime.strptime(ts, fmt)
-        except: continue
-    return None
+def latest_view(frame: pd.DataFrame, key: str) -> pd.DataFrame:
+    # Large views say they are truncated and offer the full table as an opt-in
+    show_all = False
+    if len(frame) > DISPLAY_ROWS:
+        show_all = st.checkbox(f"Show all {len(frame):,} rows (slow)", value=False, key=key)
+        if not show_all:
+            st.caption(f"Showing the latest {DISPLAY_ROWS:,} events. The downloads in the All Data tab contain the full log.")
+    return latest_rows(frame, show_all)
+
+# Export payloads are built once per upload, not re-serialized on every rerun. Keyed on the upload
+# digest: Streamlit hashes only a sample of a large frame, so two uploads differing in one row
+# would otherwise share a payload
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_csv_bytes(_df: pd.DataFrame, upload_key: str, parser_version: int) -> bytes:
+    # Encoded straight into a byte buffer: no full-size intermediate str
+    buf = io.BytesIO()
+    _df.to_csv(buf, index=False, encoding='utf-8')
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def to_parquet_bytes(_df: pd.DataFrame, upload_key: str, parser_version: int) -> bytes:
+    # Columnar + zstd: categoricals stay dictionary-encoded, typically far smaller than the CSV
+    return _df.to_parquet(index=False, compression="zstd")
 
 # -----------------------------------------------------------------------------
 # 3. SIDEBAR
@@ -142,111 +207,29 @@ with st.expander("Methodology & Technical Context (Read First)", expanded=False)
 
 st.write("")
 st.markdown("#### 1. Upload Access Log")
-uploaded_file = st.file_uploader("Upload .log or .txt file", type=None)
+uploaded_file = st.file_uploader("Upload .log or .txt file (optionally .gz / .bz2)", type=None)
 
 if uploaded_file is not None:
-    # -------------------------------------------------------------------------
-    # 5. PARSING LOGIC
-    # -------------------------------------------------------------------------
     with st.spinner("Processing log structure..."):
-        
-        # 1. ENCODING DETECTION
-        raw_bytes = uploaded_file.read()
-        text = ""
-        # Check for null bytes indicative of UTF-16
-        if b'\x00' in raw_bytes:
-            try: text = raw_bytes.decode("utf-16")
-            except: text = raw_bytes.decode("utf-16-be", errors="ignore")
-        else:
-            try: text = raw_bytes.decode("utf-8")
-            except: text = raw_bytes.decode("latin-1", errors="ignore")
-        
-        text = text.replace('\x00', '')
-        raw_lines = text.splitlines()
-        clean_entries = []
-        
-        # 2. LOG RE-ASSEMBLY
-        # Locate Valid IP + Timestamp to identify start of a line
-        ip_finder = re.compile(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})')
-        date_finder = re.compile(r'\[\d{2}/[A-Z][a-z]{2}/\d{4}')
-
-        current_buffer = ""
-        
-        for line in raw_lines:
-            line = line.strip()
-            if not line: continue
-            
-            # Start of new entry?
-            if date_finder.search(line):
-                if current_buffer:
-                    clean_entries.append(current_buffer)
-                
-                # Strip Prefix (grep output)
-                ip_match = ip_finder.search(line)
-                if ip_match:
-                    current_buffer = line[ip_match.start():]
-                else:
-                    current_buffer = line
-            else:
-                # Continuation of previous entry
-                current_buffer += " " + line
-        
-        if current_buffer:
-            clean_entries.append(current_buffer)
-
-    # 3. EXTRACTION
-    with st.spinner(f"Classifying {len(clean_entries)} events..."):
-        hits = []
-        for entry in clean_entries:
-            try:
-                # Regex Extraction
-                ip_m = ip_finder.search(entry)
-                ip = ip_m.group(1) if ip_m else "-"
-                
-                time_m = re.search(r'\[([^\]]+)\]', entry)
-                dt_str = time_m.group(1) if time_m else ""
-                dt = extract_time(dt_str)
-                
-                # Extract quoted strings
-                quotes = re.findall(r'"([^"]*)"', entry)
-                request = quotes[0] if len(quotes) > 0 else "-"
-                referer = quotes[1] if len(quotes) > 1 else "-"
-                ua = quotes[-1] if len(quotes) > 2 else "-"
-                
-                # Parse Request
-                req_parts = request.split()
-                method = req_parts[0] if len(req_parts) > 0 else "-"
-                path = req_parts[1] if len(req_parts) > 1 else "-"
-                
-                # Parse Status
-                clean_for_status = re.sub(r'"[^"]*"', '', entry) 
-                status_m = re.search(r'\s(\d{3})\s', clean_for_status)
-                status = status_m.group(1) if status_m else "000"
-
-                # Identify Bot
-                bot_type = identify_bot(ua)
-                
-                hits.append({
-                    "IP": ip, "Time": dt, "Method": method, "Path": path,
-                    "Status": status, "Referer": referer, "User Agent": ua,
-                    "Category": bot_type
-                })
-            except: continue
-
-        df = pd.DataFrame(hits)
+        raw_bytes = uploaded_file.getvalue()
+        upload_key = upload_digest(raw_bytes)
+        df = parse_log(raw_bytes, upload_key, PARSER_VERSION)
 
     if not df.empty:
         # ---------------------------------------------------------------------
-        # 7. RESULTS DASHBOARD
+        # 5. RESULTS DASHBOARD
         # ---------------------------------------------------------------------
         st.markdown("---")
         st.markdown("### Analysis Report")
         
+        # One pass over the column, shared by the metrics and the pie chart
+        cat_counts = df['Category'].value_counts()
+        
         c1, c2, c3, c4 = st.columns(4)
         c1.metric("Total Events", f"{len(df):,}")
-        c2.metric("LLM / AI Bots", f"{len(df[df['Category']=='LLM / AI Agent']):,}")
-        c3.metric("Standard Bots", f"{len(df[df['Category']=='Standard Bot']):,}")
-        c4.metric("Human/Other", f"{len(df[df['Category']=='Human / Other']):,}")
+        c2.metric("LLM / AI Bots", f"{cat_counts.get('LLM / AI Agent', 0):,}")
+        c3.metric("Standard Bots", f"{cat_counts.get('Standard Bot', 0):,}")
+        c4.metric("Human/Other", f"{cat_counts.get('Human / Other', 0):,}")
         
         st.write("")
         
@@ -254,7 +237,7 @@ if uploaded_file is not None:
         col_pie, col_bar = st.columns(2)
         with col_pie:
             st.markdown("#### Agent Distribution")
-            counts = df['Category'].value_counts().reset_index()
+            counts = cat_counts[cat_counts > 0].reset_index()
             counts.columns = ['Category', 'Hits']
             fig = px.pie(counts, names='Category', values='Hits', hole=0.4,
                          color='Category',
@@ -280,31 +263,34 @@ if uploaded_file is not None:
         
         tab_ai, tab_std, tab_all = st.tabs(["🔴 AI Agents", "🔵 Standard Bots", "📋 All Data"])
         
+        # Only the two bot slices are materialized; on the categorical the masks are int8 code compares
         with tab_ai:
             ai_df = df[df['Category'] == "LLM / AI Agent"]
             if not ai_df.empty:
-                st.dataframe(ai_df['User Agent'].value_counts().reset_index(name='Hits'), use_container_width=True)
+                st.dataframe(ai_df['User Agent'].cat.remove_unused_categories().value_counts().reset_index(name='Hits'), use_container_width=True)
                 with st.expander("View Full AI Logs"):
-                    st.dataframe(ai_df, use_container_width=True)
+                    st.dataframe(latest_view(ai_df, "show_all_ai"), use_container_width=True)
             else:
                 st.success("No AI Agents detected.")
 
         with tab_std:
             std_df = df[df['Category'] == "Standard Bot"]
             if not std_df.empty:
-                st.dataframe(std_df['User Agent'].value_counts().reset_index(name='Hits'), use_container_width=True)
+                st.dataframe(std_df['User Agent'].cat.remove_unused_categories().value_counts().reset_index(name='Hits'), use_container_width=True)
                 with st.expander("View Full Standard Bot Logs"):
-                    st.dataframe(std_df, use_container_width=True)
+                    st.dataframe(latest_view(std_df, "show_all_std"), use_container_width=True)
             else:
                 st.info("No Standard Bots (Google/Bing) detected.")
 
         with tab_all:
             st.dataframe(
-                df.sort_values(by="Time", ascending=False),
+                latest_view(df, "show_all_data"),
                 use_container_width=True,
                 column_config={"Time": st.column_config.DatetimeColumn("Timestamp", format="D MMM, HH:mm:ss")}
             )
-            st.download_button("Download Full CSV", df.to_csv(index=False).encode('utf-8'), "log_analysis.csv", "text/csv")
+            col_csv, col_pq = st.columns(2)
+            col_csv.download_button("Download Full CSV", to_csv_bytes(df, upload_key, PARSER_VERSION), "log_analysis.csv", "text/csv")
+            col_pq.download_button("Download Parquet", to_parquet_bytes(df, upload_key, PARSER_VERSION), "log_analysis.parquet", "application/vnd.apache.parquet")
 
     else:
         st.error("Parsing Failure. Please ensure the file is a standard Access Log (UTF-8 or UTF-16).")
@@ -0,0 +1,386 @@
+"""Log parsing for Log_App (decode, re-assembly, extraction, classification).
+
+Kept free of Streamlit so worker processes can import it; the app owns caching and UI.
+"""
+import bz2
+import codecs
+import io
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from itertools import chain, islice
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+try: from isal import igzip as gzip  # optional: ISA-L inflates 2-3x faster than zlib
+except ImportError: import gzip
+
+# -----------------------------------------------------------------------------
+# 1. PATTERNS
+# -----------------------------------------------------------------------------
+# Compiled once at import; the hot loops call bound methods with no re-module cache lookups
+IP_RE = re.compile(r'(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})')
+DATE_RE = re.compile(r'\[\d{2}/[A-Z][a-z]{2}/\d{4}')
+TIME_RE = re.compile(r'\[([^\]]+)\]')
+STATUS_RE = re.compile(r'\s(\d{3})\s')
+
+# Strict NCSA combined line, RE2 syntax so Arrow can test a whole column in C++. Used as a
+# validator only (a capture-free match runs on RE2's DFA); the fields are then peeled off
+# with splits. Deliberately narrow (printable ASCII tokens, letter-led ident/user, exactly
+# three quoted fields): whatever it accepts, extract_fields would read identically.
+_TOK = r'[!#-Z\\^-~]'   # printable ASCII minus space, '"', '[' and ']'
+_FIELD = r'[!#-~]'       # printable ASCII minus space and '"'
+NCSA_PATTERN = (
+    r'^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3} +'
+    r'(?:-|[A-Za-z_]' + _TOK + r'*) +(?:-|[A-Za-z_]' + _TOK + r'*) +'
+    r'\[' + _TOK + r'+(?: [+-]\d{4})?\] +'
+    r'"(?: *' + _FIELD + r'+(?: +' + _FIELD + r'+)*)? *" +'
+    r'\d{3} +' + _FIELD + r'+ +"[^"]*" +"[^"]*"$'
+)
+
+# Canonical NCSA timestamp for Arrow's C++ strptime: calendar-valid day (29/Feb excluded), a
+# year from 1000 and an offset. Arrow rolls impossible dates over, reads full month names and
+# builds year 0 where pandas gives NaT, so anything outside this shape goes to the pandas passes.
+_MONTHS_30 = r'Jan|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec'
+TS_FAST_PATTERN = (
+    r'^(?:(?:0[1-9]|1\d|2[0-8])/(?:Feb|' + _MONTHS_30 + r')|(?:29|30)/(?:' + _MONTHS_30 + r')'
+    r'|31/(?:Jan|Mar|May|Jul|Aug|Oct|Dec))'
+    r'/[1-9]\d{3}:(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d [+-](?:[01]\d|2[0-3])[0-5]\d$'
+)
+
+# -----------------------------------------------------------------------------
+# 2. BOT DATABASE
+# -----------------------------------------------------------------------------
+# Comprehensive list of AI Agents (Scrapers/LLMs)
+BOTS_AI = [
+    r'gptbot', r'chatgpt-user', r'oai-searchbot', r'openai',  # OpenAI
+    r'claudebot', r'claude-web', r'anthropic',               # Anthropic
+    r'perplexitybot', r'perplexity',                         # Perplexity
+    r'applebot-extended',                                    # Apple AI
+    r'google-extended', r'googleother', r'vertexai',         # Google AI
+    r'ccbot', r'commoncrawl',                                # Common Crawl
+    r'cohere-ai', r'cohere',                                 # Cohere
+    r'diffbot', r'bytespider', r'imagesiftbot',              # ByteDance/Scrapers
+    r'facebookbot', r'meta-externalagent', r'omgilibot',     # Meta
+    r'amazonbot', r'amazon-q',                               # Amazon
+    r'youbot', r'msnbot-media', r'bingbot-media',            # Other AI Search
+    r'ai2bot', r'mistral', r'dataminr', r'seekr',
+    r'meltwater', r'turnitin', r'sidetrade', r'semrushbot-si', 
+    r'chatgpt' # Fallback
+]
+
+# Comprehensive list of Standard SEO Crawlers
+BOTS_TRADITIONAL = [
+    r'googlebot', r'bingbot', r'yandex', r'baiduspider', r'duckduckbot', r'sogou', r'exabot', r'slurp', # Engines
+    r'ahrefsbot', r'semrushbot', r'dotbot', r'mj12bot', r'rogerbot', r'moz', r'serpstat',                # SEO Tools
+    r'petalbot', r'aspiegel', r'aspiegelbot',                                                            # Huawei
+    r'pinterest', r'linkedinbot', r'slackbot', r'twitterbot', r'facebookexternalhit', r'discordbot',     # Social
+    r'telegrambot', r'whatsapp', r'skypeuripreview',
+    r'uptime', r'pingdom', r'gtmetrix', r'screaming frog',
+    r'adsbot-google', r'mediapartners-google', r'feedfetcher-google' # Google specific services
+]
+
+# Fixed label set and order for the Category column (stable categorical codes across logs)
+CATEGORIES = ["LLM / AI Agent", "Standard Bot", "Human / Other"]
+
+# Patterns are plain substrings: escaped into one alternation per list, RE2 scans each UA once
+# in linear time (Python's re would backtrack through every branch)
+AI_PATTERN = "|".join(map(re.escape, BOTS_AI))
+TRADITIONAL_PATTERN = "|".join(map(re.escape, BOTS_TRADITIONAL))
+
+def classify_uas(uas: pa.Array) -> np.ndarray:
+    # Vectorized over the distinct UAs of a log; returns int8 codes into CATEGORIES
+    ua_l = pc.utf8_lower(uas)
+    # Arrow lowercases with simple case mappings, str.lower with full ones ('İ' -> 'i̇'); the rare
+    # non-ASCII UAs are lowered in Python so every UA matches exactly as the substring checks did
+    non_ascii = pc.fill_null(pc.invert(pc.string_is_ascii(uas)), False)
+    if pc.any(non_ascii).as_py():
+        lowered = [ua.lower() for ua in pc.filter(uas, non_ascii).to_pylist()]
+        ua_l = pc.replace_with_mask(ua_l, non_ascii, pa.array(lowered, ua_l.type))
+    is_ai = pc.match_substring_regex(ua_l, AI_PATTERN).to_numpy(zero_copy_only=False)
+    is_std = pc.match_substring_regex(ua_l, TRADITIONAL_PATTERN).to_numpy(zero_copy_only=False)
+    # Check AI First (They are the priority for blocking/analysis)
+    return np.where(is_ai, 0, np.where(is_std, 1, 2)).astype(np.int8)
+
+# -----------------------------------------------------------------------------
+# 3. EXTRACTION
+# -----------------------------------------------------------------------------
+# Entries are extracted in batches of this size; a log that fills more than one is worth
+# the worker start-up cost of going parallel
+ENTRY_BATCH = 250_000
+MAX_WORKERS = 8
+
+def extract_fields(entries: list) -> tuple:
+    # Column-wise lists (no per-row dict); every field is computed before any append
+    ips, times, methods, paths, statuses, referers, uas = [], [], [], [], [], [], []
+    for entry in entries:
+        try:
+            # Regex Extraction
+            ip_m = IP_RE.search(entry)
+            ip = ip_m.group(1) if ip_m else "-"
+
+            time_m = TIME_RE.search(entry)
+            dt_str = time_m.group(1) if time_m else ""
+
+            # Extract quoted strings (one C-level split; only complete quote pairs count)
+            parts = entry.split('"')
+            n_quoted = (len(parts) - 1) // 2
+            quotes = parts[1:2 * n_quoted:2]
+            request = quotes[0] if len(quotes) > 0 else "-"
+            referer = quotes[1] if len(quotes) > 1 else "-"
+            ua = quotes[-1] if len(quotes) > 2 else "-"
+
+            # Parse Request
+            req_parts = request.split()
+            method = req_parts[0] if len(req_parts) > 0 else "-"
+            path = req_parts[1] if len(req_parts) > 1 else "-"
+
+            # Parse Status (first bare 3-digit token outside the quoted fields)
+            bare = "".join(parts[0:2 * n_quoted + 1:2])
+            if len(parts) % 2 == 0: bare += '"' + parts[-1]
+            status_m = STATUS_RE.search(bare)
+            status = status_m.group(1) if status_m else "000"
+
+            ips.append(ip)
+            times.append(dt_str)
+            methods.append(method)
+            paths.append(path)
+            statuses.append(status)
+            referers.append(referer)
+            uas.append(ua)
+        except: continue
+    return ips, times, methods, paths, statuses, referers, uas
+
+COLUMNS = ("IP", "Time", "Method", "Path", "Status", "Referer", "User Agent")
+
+def split_fields(lines: pa.Array) -> list:
+    # Only for lines that passed NCSA_PATTERN: the quote layout is fixed, so every field
+    # sits at a known split position
+    parts = pc.split_pattern(lines, '"')
+    prefix = pc.list_element(parts, 0)
+    ip = pc.list_element(pc.split_pattern(prefix, " ", max_splits=1), 0)
+    bracketed = pc.list_element(pc.split_pattern(prefix, "[", max_splits=1), 1)
+    dt_str = pc.list_element(pc.split_pattern(bracketed, "]", max_splits=1), 0)
+    # Pad the request with "- -" so an empty or one-word request still yields method and path
+    pad, sep = pa.scalar("- -", pa.large_string()), pa.scalar(" ", pa.large_string())
+    request = pc.binary_join_element_wise(pc.ascii_trim_whitespace(pc.list_element(parts, 1)), pad, sep)
+    words = pc.ascii_split_whitespace(pc.ascii_ltrim_whitespace(request))
+    status = pc.utf8_slice_codeunits(pc.ascii_ltrim_whitespace(pc.list_element(parts, 2)), 0, 3)
+    return [ip, dt_str, pc.list_element(words, 0), pc.list_element(words, 1), status,
+            pc.list_element(parts, 3), pc.list_element(parts, 5)]
+
+def extract_frame(entries: list) -> pd.DataFrame:
+    # Well-formed lines are parsed column-at-a-time by Arrow; only the misfits take the loop
+    lines = pa.array(entries, type=pa.large_string())
+    wellformed = pc.match_substring_regex(lines, NCSA_PATTERN)
+    misfit = pc.invert(wellformed)
+    misfit_idx = pc.indices_nonzero(misfit).to_pylist()
+    fallback = extract_fields([entries[i] for i in misfit_idx])
+
+    if len(fallback[0]) != len(misfit_idx):
+        # extract_fields dropped a row; keep its semantics for the whole batch
+        columns = [pa.array(values, type=pa.large_string()) for values in extract_fields(entries)]
+    elif not misfit_idx:
+        columns = split_fields(lines)
+    elif len(misfit_idx) == len(entries):
+        columns = [pa.array(values, type=pa.large_string()) for values in fallback]
+    else:
+        # Scatter both halves back into entry order
+        empty = pa.nulls(len(entries), pa.large_string())
+        columns = [pc.replace_with_mask(pc.replace_with_mask(empty, wellformed, arr), misfit,
+                                        pa.array(values, type=pa.large_string()))
+                   for arr, values in zip(split_fields(lines.filter(wellformed)), fallback)]
+    return pd.DataFrame({col: pd.array(arr, dtype="string[pyarrow]") for col, arr in zip(COLUMNS, columns)})
+
+def usable_cpus() -> int:
+    # CPUs this process may run on (affinity / cpuset limits), not the host total os.cpu_count() reports
+    if hasattr(os, "process_cpu_count"): return os.process_cpu_count() or 1
+    if hasattr(os, "sched_getaffinity"): return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def extract_frame_parallel(entries) -> pd.DataFrame:
+    # Entries stream in as fixed-size batches, so only a window of them is ever held as Python strs
+    entries = iter(entries)
+    batches = iter(lambda: list(islice(entries, ENTRY_BATCH)), [])
+    head = list(islice(batches, 2)) or [[]]
+    n_workers = min(usable_cpus(), MAX_WORKERS)
+    # A log that fits in one batch isn't worth starting a pool for
+    if n_workers < 2 or len(head) < 2:
+        frames = [extract_frame(batch) for batch in chain(head, batches)]
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    # Batches are independent; keep a bounded number in flight and collect them in order.
+    # A batch leaves the window only once its result is in hand, so the fallback redoes exactly the rest
+    todo, frames, in_flight = chain(head, batches), [], deque()
+    try:
+        # spawn: never fork the multi-threaded Streamlit server
+        with ProcessPoolExecutor(n_workers, mp_context=multiprocessing.get_context("spawn")) as ex:
+            for batch in todo:
+                try: future = ex.submit(extract_frame, batch)
+                except (OSError, BrokenProcessPool):
+                    # Never entered the window: put it back in front of the rest for the serial finish
+                    todo = chain([batch], todo)
+                    raise
+                in_flight.append((batch, future))
+                while len(in_flight) > 2 * n_workers or (in_flight and in_flight[0][1].done()):
+                    frames.append(in_flight[0][1].result())
+                    in_flight.popleft()
+            while in_flight:
+                frames.append(in_flight[0][1].result())
+                in_flight.popleft()
+    except (OSError, BrokenProcessPool):
+        # Sandboxed hosts may refuse to start processes; finish serially from where the pool stopped
+        frames.extend(extract_frame(batch) for batch in chain((batch for batch, _ in in_flight), todo))
+    return pd.concat(frames, ignore_index=True)
+
+# -----------------------------------------------------------------------------
+# 4. LOG PARSER
+# -----------------------------------------------------------------------------
+def parse_timestamps(ts_strings: pd.Series) -> pd.Series:
+    # Standard NCSA format: 19/Sep/2025:00:00:39 +0530
+    # Vectorized with cache=True: repeated timestamps are parsed once; mixed offsets normalize to UTC
+    ts = ts_strings.str.strip()
+    # Canonical stamps go through Arrow's strptime in one C++ pass (several times faster than pandas'),
+    # over the distinct stamps only and taken back to rows, as cache=True does for pandas
+    arr = pa.array(ts, pa.large_string())
+    # A frame concatenated from several batches arrives chunked; the dictionary must span all rows
+    if isinstance(arr, pa.ChunkedArray): arr = arr.combine_chunks()
+    encoded = arr.dictionary_encode()
+    stamps = encoded.dictionary
+    fast = pc.strptime(pc.if_else(pc.match_substring_regex(stamps, TS_FAST_PATTERN), stamps, None),
+                       format="%d/%b/%Y:%H:%M:%S %z", unit="us", error_is_null=True)
+    parsed = pd.Series(fast.take(encoded.indices).to_pandas(), index=ts.index, name=ts.name)
+    rest = parsed.isna() & (ts != "")
+    if rest.any():
+        parsed[rest] = pd.to_datetime(ts[rest], format="%d/%b/%Y:%H:%M:%S %z", errors="coerce", utc=True, cache=True)
+    # Fallback pass for entries logged without a timezone offset
+    missing = parsed.isna() & (ts != "")
+    if missing.any():
+        naive = pd.to_datetime(ts[missing], format="%d/%b/%Y:%H:%M:%S", errors="coerce", cache=True)
+        parsed[missing] = naive.dt.tz_localize("UTC")
+    return parsed
+
+# Uploads are decoded a block at a time, so the full text and its line list never coexist in memory
+READ_BLOCK = 1 << 20
+
+# bzip2 stream header: 'BZh', a block-size digit, then the first block's (or, for an empty
+# stream, the end-of-stream) magic; a plain file that merely starts with "BZh1" doesn't match
+BZ2_MAGIC = re.compile(rb'BZh[1-9](?:1AY&SY|\x17rE8P\x90)')
+
+class CorruptArchive(Exception):
+    # Raised instead of OSError/EOFError so the process-pool fallback (which treats OSError as
+    # "cannot start workers") never mistakes a truncated upload for a sandboxed host
+    pass
+
+def inflate_blocks(stream):
+    try: yield from iter(partial(stream.read, READ_BLOCK), b"")
+    except (OSError, EOFError) as exc: raise CorruptArchive(str(exc)) from exc
+
+def read_blocks(raw_bytes: bytes):
+    # Compressed uploads (sniffed by magic number) are inflated block by block as they are read
+    if raw_bytes[:2] == b'\x1f\x8b':
+        return inflate_blocks(gzip.GzipFile(fileobj=io.BytesIO(raw_bytes)))
+    if BZ2_MAGIC.match(raw_bytes[:10]):
+        return inflate_blocks(bz2.BZ2File(io.BytesIO(raw_bytes)))
+    view = memoryview(raw_bytes)
+    return (view[start:start + READ_BLOCK] for start in range(0, len(view), READ_BLOCK))
+
+def iter_lines(raw_bytes: bytes, encoding: str, errors: str):
+    # Incremental decoder carries multi-byte sequences split across block edges
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    # Pieces of a line that spans blocks; joined once when it completes, so a huge line
+    # costs one copy instead of one per block
+    pending = []
+    # A line that ended the previous block on '\r' may have its '\n' at the head of this one
+    skip_lf = False
+    for block in read_blocks(raw_bytes):
+        text = decoder.decode(block).replace('\x00', '')
+        if not text: continue
+        if skip_lf and text[0] == '\n': text = text[1:]
+        lines = text.splitlines(keepends=True)
+        tail = lines.pop() if lines and lines[-1].splitlines()[0] == lines[-1] else None
+        if pending and lines:
+            lines[0] = "".join(pending) + lines[0]
+            pending = []
+        if tail is not None:
+            pending.append(tail)
+        skip_lf = tail is None and text.endswith('\r')
+        yield from lines
+    text = decoder.decode(b"", True).replace('\x00', '')
+    if skip_lf and text[:1] == '\n': text = text[1:]
+    yield from ("".join(pending) + text).splitlines()
+
+def parse_raw_log(raw_bytes: bytes) -> pd.DataFrame:
+    try: return parse_stream(raw_bytes)
+    except CorruptArchive:
+        # Truncated/corrupt .gz or .bz2: nothing trustworthy to show, so hand back an empty
+        # frame and let the app report a parsing failure instead of a traceback
+        return build_frame(())
+
+def parse_stream(raw_bytes: bytes) -> pd.DataFrame:
+    # 1. ENCODING DETECTION
+    # Sniff the BOM / null bytes (indicative of UTF-16) in the first 64 KB instead of the whole file
+    head = bytes(next(iter(read_blocks(raw_bytes)), b"")[:65536])
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')) or b'\x00' in head:
+        attempts = (("utf-16", "strict"), ("utf-16-be", "ignore"))
+    else:
+        # utf-8-sig also drops a leading UTF-8 BOM
+        attempts = (("utf-8-sig", "strict"), ("latin-1", "ignore"))
+
+    # A strict decode can fail mid-stream, so the whole pass restarts with the lenient codec
+    for encoding, errors in attempts:
+        try: return build_frame(iter_entries(iter_lines(raw_bytes, encoding, errors)))
+        except UnicodeDecodeError: continue
+
+def iter_entries(raw_lines):
+    # 2. LOG RE-ASSEMBLY
+    # Yields entries as they complete; no list of every entry is built
+    # Locate Valid IP + Timestamp to identify start of a line
+    current_buffer = ""
+
+    for line in raw_lines:
+        line = line.strip()
+        if not line: continue
+        
+        # Start of new entry? ('[' test keeps continuation lines out of the regex engine)
+        if '[' in line and DATE_RE.search(line):
+            if current_buffer:
+                yield current_buffer
+            
+            # Strip Prefix (grep output)
+            ip_match = IP_RE.search(line)
+            if ip_match:
+                current_buffer = line[ip_match.start():]
+            else:
+                current_buffer = line
+        else:
+            # Continuation of previous entry
+            current_buffer += " " + line
+    
+    if current_buffer:
+        yield current_buffer
+
+def build_frame(entries) -> pd.DataFrame:
+    # 3. EXTRACTION
+    # Vectorized batch by batch, fanned out across worker processes for large logs;
+    # columns arrive as Arrow-backed strings
+    df = extract_frame_parallel(entries)
+    if not df.empty:
+        df["Time"] = parse_timestamps(df["Time"])
+        # 4. CLASSIFICATION
+        # Classify each distinct UA once, then broadcast its category code to every row
+        ua_codes, uas = df["User Agent"].factorize()
+        cat_codes = classify_uas(pa.array(uas))
+        df["Category"] = pd.Categorical.from_codes(cat_codes[ua_codes], categories=CATEGORIES)
+        # UAs repeat heavily: dictionary-encode so each distinct string is stored once
+        df["User Agent"] = pd.Categorical.from_codes(ua_codes, categories=uas)
+        # Low-cardinality columns as categoricals: int8 codes instead of one str per row
+        for col in ("Status", "Method"):
+            df[col] = df[col].astype("category")
+    return df
@@ -0,0 +1,164 @@
+import bz2
+import codecs
+import gzip
+from itertools import product
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+import log_core
+
+# Building blocks for NCSA-ish lines: well-formed values plus the awkward ones the
+# validator has to either read exactly like extract_fields or reject outright
+IPS = ["203.0.113.9", "10.0.0.1 ", "999.1.1.1"]
+IDENTS = ["- -", "frank bob", "- user_1", "[x] -", "-  -"]
+STAMPS = ["[19/Sep/2025:00:00:39 +0530]", "[19/Sep/2025:00:00:39]", "[]", "[19/Sep/2025:00:00:39  +0530]"]
+REQUESTS = ['"GET /index.html HTTP/1.1"', '"GET /"', '""', '" POST  /a?b=1 "', '"-"', '"GET /ü HTTP/1.1"', '"GET /a"b"']
+TAILS = ['200 512', '404 -', '200  0', '2000 1', 'abc 1']
+QUOTED = ['"-" "Mozilla/5.0 (compatible; GPTBot/1.0)"', '"https://x.test/[a]" "curl/8.0"', '"" ""',
+          '"-" "a" "b"', '"-"', '"ref" "ua with \\" escape"']
+
+
+def sample_lines():
+    for ip, ident, stamp, request, tail, quoted in product(IPS, IDENTS, STAMPS, REQUESTS, TAILS, QUOTED):
+        yield f"{ip} {ident} {stamp} {request} {tail} {quoted}"
+
+
+def test_split_fields_reads_accepted_lines_like_extract_fields():
+    lines = list(sample_lines())
+    accepted_mask = pc.match_substring_regex(pa.array(lines, pa.large_string()), log_core.NCSA_PATTERN)
+    accepted = [line for line, ok in zip(lines, accepted_mask.to_pylist()) if ok]
+    # Both paths must be exercised for the comparison to mean anything
+    assert 0 < len(accepted) < len(lines)
+
+    fast = [column.to_pylist() for column in log_core.split_fields(pa.array(accepted, pa.large_string()))]
+    slow = [list(column) for column in log_core.extract_fields(accepted)]
+    for name, got, expected in zip(log_core.COLUMNS, fast, slow):
+        assert got == expected, name
+
+
+@pytest.mark.parametrize("line", [
+    '203.0.113.9 - - [19/Sep/2025:00:00:39 +0530] "GET / HTTP/1.1" 200 512 "-" "a" "b"',
+    '203.0.113.9 [x] - [19/Sep/2025:00:00:39 +0530] "GET / HTTP/1.1" 200 512 "-" "ua"',
+    '203.0.113.9 - - [19/Sep/2025:00:00:39 +0530] "GET /ü HTTP/1.1" 200 512 "-" "ua"',
+    'host: 203.0.113.9 - - [19/Sep/2025:00:00:39 +0530] "GET / HTTP/1.1" 200 512 "-" "ua"',
+])
+def test_validator_rejects_lines_outside_the_fixed_layout(line):
+    assert not pc.match_substring_regex(pa.array([line]), log_core.NCSA_PATTERN)[0].as_py()
+
+
+def substring_category(ua):
+    # The per-UA substring classifier that classify_uas replaced
+    if not ua or ua == "-": return 2
+    ua_l = ua.lower()
+    if any(p in ua_l for p in log_core.BOTS_AI): return 0
+    if any(p in ua_l for p in log_core.BOTS_TRADITIONAL): return 1
+    return 2
+
+
+USER_AGENTS = [
+    "", "-", " - ", "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    "Mozilla/5.0 (compatible; GPTBot/1.2; +https://openai.com/gptbot)", "CLAUDEBOT", "ClaudeBot googlebot",
+    "Googlebot/2.1 (+http://www.google.com/bot.html)", "Screaming Frog SEO Spider/19.0", "screaming  frog",
+    "screaming-frog", "Mozilla/5.0 (compatible; AhrefsBot/7.0)", "meta-externalagent/1.1", "meta externalagent",
+    "google-extended", "googleother", "GoogleOther-Image", "bingbot/2.0", "ChatGPT-User/1.0", "chatgpt user",
+    "a.b*c+d?(e)[f]{g}|h^$\\", "ÄppleBot-Extended", "İmagesiftbot", "K bytespider", "curl/8.4.0",
+]
+
+
+def test_classify_uas_matches_the_substring_classifier():
+    uas = USER_AGENTS + [p for p in log_core.BOTS_AI + log_core.BOTS_TRADITIONAL]
+    uas += [p.upper() for p in log_core.BOTS_AI + log_core.BOTS_TRADITIONAL]
+    got = log_core.classify_uas(pa.array(uas)).tolist()
+    assert got == [substring_category(ua) for ua in uas]
+
+
+def pandas_timestamps(ts_strings):
+    # The pure-pandas parse that the Arrow fast path must reproduce
+    ts = ts_strings.str.strip()
+    parsed = pd.to_datetime(ts, format="%d/%b/%Y:%H:%M:%S %z", errors="coerce", utc=True)
+    missing = parsed.isna() & (ts != "")
+    naive = pd.to_datetime(ts[missing], format="%d/%b/%Y:%H:%M:%S", errors="coerce")
+    parsed[missing] = naive.dt.tz_localize("UTC")
+    return parsed
+
+
+STAMPS_EDGE = [
+    "19/Sep/2025:00:00:39 +0530", "19/Sep/2025:00:00:39 -0700", "19/Sep/2025:00:00:39", " 19/Sep/2025:00:00:39 +0000 ",
+    "01/Jan/0000:00:00:00 +0000", "01/Jan/0001:00:00:00 +0000", "01/Jan/0999:00:00:00 +0000", "01/Jan/1000:00:00:00 +0000",
+    "31/Dec/9999:23:59:59 -2359", "29/Feb/2024:12:00:00 +0100", "29/Feb/2023:12:00:00 +0100", "29/Feb/2023:12:00:00",
+    "31/Jan/2025:00:00:00 +0000", "31/Apr/2025:00:00:00 +0000", "30/Feb/2025:00:00:00 +0000", "19/Sep/2025:00:00:60 +0000",
+    "19/Sep/2025:24:00:00 +0000", "19/September/2025:00:00:39 +0530", "19/sep/2025:00:00:39 +0530", "9/Sep/2025:00:00:39 +0530",
+    "19/Sep/2025:00:00:39 +05:30", "19/Sep/2025:00:00:39 Z", "19/Sep/2025:00:00:39 +9999", "19/Sep/2025:00:00:39 +0530x",
+    "", "-", "garbage",
+]
+
+
+def test_parse_timestamps_matches_pandas_on_edge_cases():
+    # Each stamp appears several times, so results must map back to every row
+    ts = pd.Series(STAMPS_EDGE * 3, dtype="string[pyarrow]", name="Time")
+    got, expected = log_core.parse_timestamps(ts), pandas_timestamps(ts)
+    assert got.isna().tolist() == expected.isna().tolist()
+    assert got.dropna().tolist() == expected.dropna().tolist()
+
+
+def sample_log(n=500):
+    return "\n".join(f'203.0.113.{i % 250} - - [{i % 28 + 1:02d}/Sep/2025:00:00:{i % 60:02d} +0530] '
+                     f'"GET /p{i} HTTP/1.1" 200 {i} "-" "Mozilla/5.0 (compatible; GPTBot/1.{i % 3})"'
+                     for i in range(n)).encode()
+
+
+def test_parse_raw_log_is_independent_of_batch_size(monkeypatch):
+    # Several batches concatenate into chunked Arrow columns, which the later passes must accept
+    raw = sample_log()
+    whole = log_core.parse_raw_log(raw)
+    monkeypatch.setattr(log_core, "ENTRY_BATCH", 64)
+    pd.testing.assert_frame_equal(log_core.parse_raw_log(raw), whole)
+
+
+TEXT = "é first line\r\nsecond ü€𝄞 line\r\n\r\nthird\rfourth\nlast\r"
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "utf-16-be"])
+@pytest.mark.parametrize("block", range(1, 12))
+def test_iter_lines_matches_splitlines_across_block_edges(monkeypatch, encoding, block):
+    # Tiny blocks split multi-byte characters, surrogate pairs and CRLF pairs at every offset
+    monkeypatch.setattr(log_core, "READ_BLOCK", block)
+    raw = codecs.encode(TEXT, encoding)
+    lines = [line.rstrip("\r\n") for line in log_core.iter_lines(raw, encoding, "strict")]
+    assert lines == TEXT.splitlines()
+
+
+def test_iter_lines_rejoins_a_line_longer_than_a_block(monkeypatch):
+    monkeypatch.setattr(log_core, "READ_BLOCK", 7)
+    text = "short\n" + "x" * 100 + "\r\nend"
+    assert [line.rstrip("\r\n") for line in log_core.iter_lines(text.encode(), "utf-8", "strict")] == text.splitlines()
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress])
+def test_compressed_upload_parses_like_the_plain_file(compress):
+    raw = sample_log()
+    pd.testing.assert_frame_equal(log_core.parse_raw_log(compress(raw)), log_core.parse_raw_log(raw))
+
+
+@pytest.mark.parametrize("corrupt", [
+    gzip.compress(sample_log())[:-30],
+    bz2.compress(sample_log())[:-30],
+    b"\x1f\x8b" + b"garbage" * 50,
+    b"BZh91AY&SY" + b"garbage" * 50,
+])
+def test_corrupt_archive_parses_to_an_empty_frame(corrupt):
+    df = log_core.parse_raw_log(corrupt)
+    assert df.empty
+    assert list(df.columns[:len(log_core.COLUMNS)]) == list(log_core.COLUMNS)
+
+
+def test_plain_log_starting_with_bzip2_header_is_not_decompressed(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("plain text sent to BZ2File")
+    monkeypatch.setattr(log_core.bz2, "BZ2File", refuse)
+    raw = sample_log()
+    df = log_core.parse_raw_log(b"BZh1 not an archive\n" + raw)
+    pd.testing.assert_frame_equal(df.iloc[1:].reset_index(drop=True), log_core.parse_raw_log(raw), check_categorical=False)